@@ -0,0 +1,77 @@
+import os
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+from benchmarks.synthetic import generate_catalog
+from exports import generate_ics_file_for_classes
+
+# Exports a calendar with every section of a full faculty catalog, comparing the
+# indexed ICS export with the original scan-based one.
+# Run from the repository root: python -m benchmarks.bench_ics
+
+def legacy_generate_ics_file_for_classes(selected_classes, classes, start_date_str, end_date_str, filename):
+    from icalendar import Calendar, Event
+
+    cal = Calendar()
+    start_date = datetime.strptime(start_date_str, '%Y-%m-%d')
+    end_date = datetime.strptime(end_date_str, '%Y-%m-%d')
+    day_mapping = {
+        "Lunes": "Monday", "Martes": "Tuesday", "Miércoles": "Wednesday", "Jueves": "Thursday",
+        "Viernes": "Friday", "Sábado": "Saturday", "Domingo": "Sunday"
+    }
+
+    for selected_class in selected_classes:
+        cls = next(
+            (item for item in classes if item["name"] == selected_class['name'] and item["group"] == selected_class['group']),
+            None
+        )
+        if cls is None:
+            continue
+        for session in cls['schedule']:
+            day_english = day_mapping.get(session['day'], session['day'])
+            first_occurrence_date = start_date
+            while first_occurrence_date.strftime('%A') != day_english:
+                first_occurrence_date += timedelta(days=1)
+                if first_occurrence_date > end_date:
+                    break
+            if first_occurrence_date > end_date:
+                continue
+            start_datetime = datetime.combine(first_occurrence_date, datetime.strptime(session['start_time'], '%H:%M').time())
+            end_datetime = datetime.combine(first_occurrence_date, datetime.strptime(session['end_time'], '%H:%M').time())
+            if end_datetime <= start_datetime:
+                continue
+            event = Event()
+            event.add('summary', f"{cls['name']} - Grupo {cls['group']}")
+            event.add('location', session.get('class_room', 'N/A'))
+            event.add('dtstart', start_datetime)
+            event.add('dtend', end_datetime)
+            event.add('rrule', {'freq': 'weekly', 'until': end_date})
+            cal.add_component(event)
+
+    with open(filename, 'wb') as f:
+        f.write(cal.to_ical())
+
+SCALES = [(50, 4), (200, 5), (400, 8)]  # (subjects, sections per subject)
+
+def main():
+    start, end = date(2024, 3, 11), date(2024, 7, 12)
+    print(f"{'sections':>9} {'legacy (s)':>11} {'indexed (s)':>12} {'speedup':>8}", flush=True)
+    for num_subjects, sections in SCALES:
+        classes = generate_catalog(num_subjects, sections, seed=num_subjects)
+        selected = [{'name': cls['name'], 'group': cls['group']} for cls in classes]
+
+        with tempfile.TemporaryDirectory() as directory:
+            began = time.perf_counter()
+            legacy_generate_ics_file_for_classes(selected, classes, start.isoformat(), end.isoformat(),
+                                                 os.path.join(directory, "horario_clases.ics"))
+            legacy_time = time.perf_counter() - began
+
+        began = time.perf_counter()
+        generate_ics_file_for_classes(selected, classes, [(start, end)])
+        indexed_time = time.perf_counter() - began
+
+        print(f"{len(classes):>9} {legacy_time:>11.3f} {indexed_time:>12.3f} {legacy_time / indexed_time:>7.1f}x", flush=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+import os
+import time
+
+from benchmarks.synthetic import generate_catalog
+from scheduler import load_sections, ScheduleSearch, parallel_viable_schedules
+
+# Serial search against the process pool search on 1/2/4/8 workers.
+# Run from the repository root: python -m benchmarks.bench_parallel
+
+WORKER_COUNTS = [1, 2, 4, 8]
+
+def main():
+    sections = load_sections(generate_catalog(14, 5, seed=14))
+    num_classes, mandatory = 6, ["Materia 1"]
+
+    start = time.perf_counter()
+    expected = list(ScheduleSearch(sections, num_classes, mandatory))
+    serial_time = time.perf_counter() - start
+    print(f"{len(sections)} sections, {len(expected)} schedules, {os.cpu_count()} cpus", flush=True)
+    print(f"{'workers':>8} {'time (s)':>9} {'speedup':>8}", flush=True)
+    print(f"{'serial':>8} {serial_time:>9.3f} {1:>7.1f}x", flush=True)
+
+    for workers in WORKER_COUNTS:
+        start = time.perf_counter()
+        found = parallel_viable_schedules(sections, num_classes, mandatory, workers=workers)
+        elapsed = time.perf_counter() - start
+        if found != expected:
+            raise AssertionError(f"Parallel results differ with {workers} workers")
+        print(f"{workers:>8} {elapsed:>9.3f} {serial_time / elapsed:>7.1f}x", flush=True)
+
+if __name__ == "__main__":
+    main()
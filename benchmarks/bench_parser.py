@@ -0,0 +1,92 @@
+import csv
+import io
+import json
+import re
+import time
+from datetime import datetime
+
+from benchmarks.synthetic import generate_catalog, pasted_lines
+from importers import iter_schedule_classes, parse_schedule_data
+
+# Parses a 100k line catalog pasted from the university system, comparing the
+# streaming parser with the original fixed-stride one, plus the CSV and JSON Lines
+# versions of the same catalog.
+# Run from the repository root: python -m benchmarks.bench_parser
+
+NUM_LINES = 100_000
+
+def legacy_parse_schedule_data(raw_data):
+    lines = raw_data.strip().split('\n')
+    classes = {}
+    for i in range(0, len(lines), 6):
+        if len(lines[i:i+6]) < 6:
+            continue
+        class_name_match = re.match(r'^(.*)\s\(\d{4}\)', lines[i])
+        if not class_name_match:
+            continue
+        class_name = class_name_match.group(1)
+        group = lines[i+1].strip()
+        day = lines[i+4].strip()
+        time_range = lines[i+5].strip()
+        if ' a ' not in time_range:
+            continue
+        start_time, end_time = time_range.split(' a ')
+        try:
+            start_time = datetime.strptime(start_time.strip(), "%H:%M").time()
+            end_time = datetime.strptime(end_time.strip(), "%H:%M").time()
+        except ValueError:
+            continue
+        if (class_name, group) not in classes:
+            classes[(class_name, group)] = {"name": class_name, "group": group, "schedule": []}
+        classes[(class_name, group)]['schedule'].append({
+            "day": day,
+            "start_time": start_time.strftime("%H:%M"),
+            "end_time": end_time.strftime("%H:%M"),
+            "class_room": "Sin asignar"
+        })
+    return list(classes.values())
+
+def pasted_catalog(classes):
+    lines = pasted_lines(classes)
+    return "\n".join(lines[:NUM_LINES - NUM_LINES % 6])
+
+def csv_catalog(classes):
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(["name", "group", "day", "start_time", "end_time", "class_room"])
+    for cls in classes:
+        for session in cls['schedule']:
+            writer.writerow([cls['name'], cls['group'], session['day'], session['start_time'],
+                             session['end_time'], session['class_room']])
+    return output.getvalue()
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+def count_streamed(text, format):
+    return sum(1 for _ in iter_schedule_classes(io.StringIO(text), format))
+
+def main():
+    sessions_needed = NUM_LINES // 6
+    classes = generate_catalog(sessions_needed // 10 + 1, 5, sessions_per_week=2, seed=6)
+    pasted = pasted_catalog(classes)
+    print(f"{pasted.count(chr(10)) + 1} pasted lines", flush=True)
+
+    expected, legacy_time = timed(legacy_parse_schedule_data, pasted)
+    found, streaming_time = timed(parse_schedule_data, pasted)
+    if found != expected:
+        raise AssertionError("Streaming parser results differ from the original parser")
+    lines = pasted.count("\n") + 1
+    print(f"{'parser':<18} {'time (s)':>9} {'lines/s':>10}", flush=True)
+    print(f"{'pasted (legacy)':<18} {legacy_time:>9.3f} {lines / legacy_time:>10.0f}", flush=True)
+    print(f"{'pasted':<18} {streaming_time:>9.3f} {lines / streaming_time:>10.0f}", flush=True)
+
+    for format, text in (("csv", csv_catalog(classes)), ("json", "\n".join(json.dumps(cls) for cls in classes))):
+        _, elapsed = timed(count_streamed, text, format)
+        format_lines = text.count("\n") + 1
+        print(f"{format:<18} {elapsed:>9.3f} {format_lines / elapsed:>10.0f}", flush=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+import time
+from itertools import combinations
+
+from benchmarks.synthetic import generate_catalog
+from scheduler import (parse_class_times, has_conflict, has_unique_classes, has_free_days, load_sections,
+                       find_viable_schedules)
+
+# Compares the backtracking solver against the original combinations() filter.
+# Run from the repository root: python -m benchmarks.bench_solver
+
+def brute_force_viable_schedules(classes, num_classes, mandatory_classes=(), free_days=()):
+    return [
+        combo for combo in combinations(classes, num_classes)
+        if not any(has_conflict(cls1, cls2) for cls1, cls2 in combinations(combo, 2))
+        and has_unique_classes(combo)
+        and has_free_days(combo, free_days)
+        and all(any(cls['name'] == mandatory_class for cls in combo) for mandatory_class in mandatory_classes)
+    ]
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+SCENARIOS = [
+    # (subjects, sections per subject, classes to attend, mandatory, free days)
+    (6, 3, 4, 1, []),
+    (8, 4, 5, 2, ["Viernes"]),
+    (10, 4, 5, 2, []),
+    (10, 5, 5, 3, ["Lunes"]),
+]
+
+def main():
+    print(f"{'catalog':>10} {'k':>3} {'results':>8} {'brute (s)':>10} {'solver (s)':>11} {'speedup':>8}", flush=True)
+    for num_subjects, sections, num_classes, num_mandatory, free_days in SCENARIOS:
+        catalog = generate_catalog(num_subjects, sections, seed=num_subjects * sections)
+        mandatory = [f"Materia {i + 1}" for i in range(num_mandatory)]
+
+        expected, brute_time = timed(brute_force_viable_schedules, parse_class_times(catalog), num_classes,
+                                     mandatory, free_days)
+        found, solver_time = timed(find_viable_schedules, load_sections(catalog), num_classes, mandatory, free_days)
+        if found != expected:
+            raise AssertionError(f"Solver results differ for {num_subjects}x{sections}")
+
+        label = f"{num_subjects}x{sections}"
+        print(f"{label:>10} {num_classes:>3} {len(found):>8} {brute_time:>10.3f} "
+              f"{solver_time:>11.4f} {brute_time / max(solver_time, 1e-9):>7.1f}x", flush=True)
+
+if __name__ == "__main__":
+    main()
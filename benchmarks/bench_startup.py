@@ -0,0 +1,39 @@
+import subprocess
+import sys
+
+# Import time of the modules loaded at startup and of the ones now deferred until
+# first use, each measured in a fresh interpreter.
+# Run from the repository root: python -m benchmarks.bench_startup
+
+STARTUP_MODULES = ["streamlit", "scheduler", "storage"]
+DEFERRED_MODULES = ["pymongo", "openpyxl", "icalendar"]
+RUNS = 5
+
+def import_time(module):
+    code = f"import time; start = time.perf_counter(); import {module}; print(time.perf_counter() - start)"
+    times = []
+    for _ in range(RUNS):
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+        if result.returncode != 0:
+            return None
+        times.append(float(result.stdout))
+    return min(times)
+
+def report(title, modules):
+    print(title, flush=True)
+    total = 0.0
+    for module in modules:
+        elapsed = import_time(module)
+        if elapsed is None:
+            print(f"  {module:<12} not installed", flush=True)
+            continue
+        total += elapsed
+        print(f"  {module:<12} {elapsed * 1000:>8.1f} ms", flush=True)
+    print(f"  {'total':<12} {total * 1000:>8.1f} ms", flush=True)
+
+def main():
+    report("Imported at startup", STARTUP_MODULES)
+    report("Deferred until first use", DEFERRED_MODULES)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import date, datetime
+from itertools import combinations
+
+from benchmarks.synthetic import generate_catalog, pasted_lines
+from exports import create_single_sheet_xlsx_timetables, generate_ics_file_for_classes
+from importers import parse_schedule_data
+from scheduler import (parse_class_times, has_conflict, get_unique_time_slots, load_sections, ScheduleSearch,
+                       schedule_classes, Constraints)
+
+# Throughput and peak memory of every stage of the pipeline over seeded synthetic
+# catalogs of several sizes, saved as JSON so runs can be compared.
+# Run from the repository root:
+#   python -m benchmarks.suite --output results.json
+#   python -m benchmarks.suite --compare results.json
+
+SCALES = {
+    # subjects, sections per subject, sessions per week, conflict density
+    "small": (20, 4, 2, 0.2),
+    "medium": (60, 6, 3, 0.5),
+    "large": (200, 8, 3, 0.7),
+}
+NUM_CLASSES = 5
+MAX_CONFLICT_SECTIONS = 300
+MAX_SCHEDULES = 20_000
+EXPORTED_SCHEDULES = 200
+# The constrained search finds schedules far less often, so it is capped by
+# explored nodes instead of schedules found
+CONSTRAINTS = {"earliest_start": "10:00", "max_daily_hours": 6, "max_consecutive_hours": 4, "lunch_break": 60}
+MAX_CONSTRAINED_NODES = 200_000
+
+# Each stage builds its input from the catalog and returns (run, items, unit),
+# where run() does the measured work and items is the amount processed per run
+def conflict_stage(classes):
+    parsed = parse_class_times(classes[:MAX_CONFLICT_SECTIONS])
+    pairs = len(parsed) * (len(parsed) - 1) // 2
+    return lambda: sum(has_conflict(cls1, cls2) for cls1, cls2 in combinations(parsed, 2)), pairs, "pairs"
+
+def section_conflict_stage(classes):
+    sections = load_sections(classes[:MAX_CONFLICT_SECTIONS])
+    pairs = len(sections) * (len(sections) - 1) // 2
+    return lambda: sum(s1.has_conflict(s2) for s1, s2 in combinations(sections, 2)), pairs, "pairs"
+
+def solver_stage(classes):
+    sections = load_sections(classes)
+    search = ScheduleSearch(sections, NUM_CLASSES)
+    search.take(MAX_SCHEDULES)
+    return lambda: ScheduleSearch(sections, NUM_CLASSES).take(MAX_SCHEDULES), search.explored, "nodes"
+
+def constrained_solver_stage(classes):
+    sections = load_sections(classes)
+    constraints = Constraints(**CONSTRAINTS)
+
+    def run():
+        search = ScheduleSearch(sections, NUM_CLASSES, constraints=constraints)
+        search.take(MAX_SCHEDULES, stop=lambda: search.explored >= MAX_CONSTRAINED_NODES)
+        return search
+
+    return run, run().explored, "nodes"
+
+def xlsx_stage(classes):
+    sections = load_sections(classes)
+    combos = [schedule_classes(sections, combo) for combo in ScheduleSearch(sections, NUM_CLASSES).take(EXPORTED_SCHEDULES)]
+    time_slots = get_unique_time_slots([section.cls for section in sections])
+    return lambda: create_single_sheet_xlsx_timetables(combos, time_slots, classes), len(combos), "schedules"
+
+def ics_stage(classes):
+    selected = [{"name": cls['name'], "group": cls['group']} for cls in classes]
+    periods = [(date(2024, 3, 11), date(2024, 7, 12)), (date(2024, 8, 12), date(2024, 12, 6))]
+    return lambda: generate_ics_file_for_classes(selected, classes, periods), len(selected), "classes"
+
+def parser_stage(classes):
+    text = "\n".join(pasted_lines(classes))
+    return lambda: parse_schedule_data(text), text.count("\n") + 1, "lines"
+
+STAGES = {
+    "has_conflict": conflict_stage,
+    "section_conflict": section_conflict_stage,
+    "solver": solver_stage,
+    "solver_constrained": constrained_solver_stage,
+    "xlsx": xlsx_stage,
+    "ics": ics_stage,
+    "parser": parser_stage,
+}
+
+# Best time of repeat runs, then one more run under tracemalloc for the peak memory
+def measure(run, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        run()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return best, peak
+
+def run_suite(scales, stages, repeat=3, seed=0):
+    results = []
+    for scale in scales:
+        num_subjects, sections, sessions, density = SCALES[scale]
+        classes = generate_catalog(num_subjects, sections, sessions_per_week=sessions, seed=seed,
+                                   conflict_density=density)
+        for stage in stages:
+            run, items, unit = STAGES[stage](classes)
+            seconds, peak = measure(run, repeat)
+            result = {
+                "stage": stage,
+                "scale": scale,
+                "sections": len(classes),
+                "items": items,
+                "unit": unit,
+                "seconds": round(seconds, 6),
+                "throughput": round(items / seconds, 1) if seconds else None,
+                "peak_kb": round(peak / 1024, 1),
+            }
+            results.append(result)
+            print(f"{stage:<19} {scale:<7} {items:>9} {unit:<9} {seconds:>9.4f} s "
+                  f"{result['throughput'] or 0:>12.0f} {unit}/s {result['peak_kb']:>10.0f} KB", flush=True)
+    return results
+
+# Prints the change in time and peak memory against a previous run
+def compare(results, baseline):
+    previous = {(result["stage"], result["scale"]): result for result in baseline["results"]}
+    print(f"\n{'stage':<19} {'scale':<7} {'time':>8} {'memory':>8}", flush=True)
+    for result in results:
+        old = previous.get((result["stage"], result["scale"]))
+        if old is None or old["items"] != result["items"]:
+            continue
+        time_ratio = result["seconds"] / old["seconds"] if old["seconds"] else float("nan")
+        memory_ratio = result["peak_kb"] / old["peak_kb"] if old["peak_kb"] else float("nan")
+        print(f"{result['stage']:<19} {result['scale']:<7} {time_ratio:>7.2f}x {memory_ratio:>7.2f}x", flush=True)
+
+def main():
+    parser = argparse.ArgumentParser(description="Scheduler benchmark suite")
+    parser.add_argument("--scales", default=",".join(SCALES), help="comma separated, from: " + ", ".join(SCALES))
+    parser.add_argument("--stages", default=",".join(STAGES), help="comma separated, from: " + ", ".join(STAGES))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="file to save the results as JSON")
+    parser.add_argument("--compare", help="results of a previous run to compare against")
+    args = parser.parse_args()
+
+    scales, stages = args.scales.split(","), args.stages.split(",")
+    results = run_suite(scales, stages, args.repeat, args.seed)
+    report = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "seed": args.seed,
+        "repeat": args.repeat,
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+
+if __name__ == "__main__":
+    main()
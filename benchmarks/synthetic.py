@@ -0,0 +1,48 @@
+import random
+
+# Synthetic class catalogs shaped like the documents stored in MongoDB
+
+DAYS = ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes"]
+START_HOURS = [8, 10, 12, 14, 16, 18, 19]
+# Evening slots, where most sections of a real catalog pile up
+PEAK_START_HOURS = [18, 19]
+
+# conflict_density is the share of sessions that start at a peak hour, the rest
+# are spread over every start hour. With the default None every session is spread,
+# which keeps the catalogs of existing seeds unchanged.
+def generate_catalog(num_subjects, sections_per_subject, sessions_per_week=2, seed=0, conflict_density=None,
+                     session_hours=2):
+    rng = random.Random(seed)
+    classes = []
+    for subject in range(num_subjects):
+        for group in range(1, sections_per_subject + 1):
+            days = rng.sample(DAYS, sessions_per_week)
+            schedule = []
+            for day in days:
+                if conflict_density is not None and rng.random() < conflict_density:
+                    start = rng.choice(PEAK_START_HOURS)
+                else:
+                    start = rng.choice(START_HOURS)
+                schedule.append({
+                    "day": day,
+                    "start_time": f"{start:02d}:00",
+                    "end_time": f"{min(start + session_hours, 23):02d}:00",
+                    "class_room": f"{rng.randint(100, 599)}"
+                })
+            classes.append({
+                "name": f"Materia {subject + 1}",
+                "group": str(group),
+                "schedule": schedule
+            })
+    return classes
+
+# The catalog as pasted from the university system, 6 lines per session
+def pasted_lines(classes, seed=0):
+    rng = random.Random(seed)
+    lines = []
+    for cls in classes:
+        code = rng.randint(1000, 9999)
+        for session in cls['schedule']:
+            lines += [f"{cls['name']} ({code})", cls['group'], "Teórico-Práctica", "Presencial",
+                      session['day'], f"{session['start_time']} a {session['end_time']}"]
+    return lines
@@ -0,0 +1,251 @@
+import json
+import random
+import struct
+import sys
+import zlib
+from array import array
+from datetime import datetime, time, timedelta
+from io import BytesIO
+
+from importers import parse_hhmm
+from scheduler import parse_minutes
+
+# EXPORT FUNCTIONS
+# The export libraries are only imported once an export is requested.
+
+DAYS = ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes"]
+
+def get_random_light_color():
+    return "{:02x}{:02x}{:02x}".format(random.randint(100, 255), random.randint(100, 255), random.randint(100, 255))
+
+# Maps each (time slot, day column) of a combination to the class and session shown there
+def get_timetable_cells(combo):
+    cells = {}
+    for cls in combo:
+        for session in cls['schedule']:
+            if session['day'] in DAYS:
+                time_slot = (session['start_time'], session['end_time'])
+                cells[time_slot, DAYS.index(session['day']) + 2] = (cls, session)
+    return cells
+
+# Writes every combination, one below the other, in a single "Horarios" sheet.
+# The workbook is written in write-only mode with shared named styles, so rows are
+# streamed out and memory does not grow with the number of combinations.
+# output is a path or a file object, by default a new BytesIO that is returned.
+def create_single_sheet_xlsx_timetables(combinations, time_slots, classes, output=None):
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import NamedStyle, PatternFill, Alignment, Border, Side
+    from openpyxl.utils import get_column_letter
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Horarios")
+
+    # Set column widths
+    for i, column_width in enumerate([20] + [25] * 5, start=1):
+        ws.column_dimensions[get_column_letter(i)].width = column_width
+
+    # Create a dark grey border style, shared by every cell of the timetables
+    dark_grey_side = Side(border_style="thin", color="404040")
+    dark_grey_border = Border(left=dark_grey_side, right=dark_grey_side, top=dark_grey_side, bottom=dark_grey_side)
+    header_color = PatternFill(start_color="FFD700", end_color="FFD700", fill_type="solid")
+
+    def add_style(name, **attributes):
+        wb.add_named_style(NamedStyle(name=name, border=dark_grey_border, **attributes))
+        return name
+
+    cell_style = add_style("Celda")
+    header_style = add_style("Encabezado", fill=header_color)
+    class_styles = {}
+    for cls in classes:
+        if cls['name'] not in class_styles:
+            color = get_random_light_color()
+            class_styles[cls['name']] = add_style(
+                f"Clase {len(class_styles) + 1}",
+                fill=PatternFill(start_color=color, end_color=color, fill_type="solid"),
+                alignment=Alignment(wrap_text=True)
+            )
+
+    def styled_cell(value, style):
+        cell = WriteOnlyCell(ws, value=value)
+        cell.style = style
+        return cell
+
+    # Header row: the 'Hora' column only gets the border
+    header_row = [styled_cell("Hora", cell_style)] + [styled_cell(day, header_style) for day in DAYS]
+    slot_labels = [f"{start.strftime('%H:%M')} - {end.strftime('%H:%M')}" for start, end in time_slots]
+
+    ws.append([])
+    for combo in combinations:
+        ws.append(header_row)
+
+        # Populate the timetable
+        cells = get_timetable_cells(combo)
+        for time_slot, slot_label in zip(time_slots, slot_labels):
+            row = [styled_cell(slot_label, header_style)]
+            for day_col in range(2, len(DAYS) + 2):
+                entry = cells.get((time_slot, day_col))
+                if entry is None:
+                    row.append(styled_cell(None, cell_style))
+                    continue
+                cls, session = entry
+                class_room_info = session.get('class_room', 'N/A')  # Retrieve class room or default to 'N/A'
+                row.append(styled_cell(f"{cls['name']}\n(Grupo {cls['group']}\nAula: {class_room_info})",
+                                       class_styles.get(cls['name'], cell_style)))
+            ws.append(row)
+
+        for _ in range(5):
+            ws.append([])
+
+    if output is None:
+        output = BytesIO()
+    wb.save(output)
+    return output
+
+# Weekday number (Monday is 0) of the Spanish day names, English names are accepted too
+WEEKDAYS = {
+    "Lunes": 0, "Martes": 1, "Miércoles": 2, "Jueves": 3, "Viernes": 4, "Sábado": 5, "Domingo": 6,
+    "Monday": 0, "Tuesday": 1, "Wednesday": 2, "Thursday": 3, "Friday": 4, "Saturday": 5, "Sunday": 6,
+}
+
+def first_occurrence(start_date, weekday):
+    return start_date + timedelta(days=(weekday - start_date.weekday()) % 7)
+
+# Builds a calendar with a weekly event per session of the selected classes, for
+# each (start_date, end_date) period (e.g. the two semesters of a year). Sessions
+# falling on a holiday are excluded with EXDATE.
+# output is a path or a file object, by default a new BytesIO that is returned.
+def generate_ics_file_for_classes(selected_classes, classes, periods, holidays=(), output=None):
+    from icalendar import Calendar, Event
+
+    cal = Calendar()
+    cal.add('prodid', '-//Planificador de Clases//ES')
+    cal.add('version', '2.0')
+
+    classes_by_key = {(cls['name'], cls['group']): cls for cls in reversed(classes)}
+    holidays = sorted(set(holidays))
+
+    for selected_class in selected_classes:
+        cls = classes_by_key.get((selected_class['name'], selected_class['group']))
+        if cls is None:
+            continue
+
+        for session in cls['schedule']:
+            day, start_time_str, end_time_str = session['day'], session['start_time'], session['end_time']
+            weekday = WEEKDAYS.get(day)
+            if weekday is None or not start_time_str or not end_time_str:
+                continue
+
+            start_time = time(*divmod(parse_minutes(start_time_str), 60))
+            end_time = time(*divmod(parse_minutes(end_time_str), 60))
+            if end_time <= start_time:
+                # Skipping event due to invalid time range
+                continue
+
+            for start_date, end_date in periods:
+                first_date = first_occurrence(start_date, weekday)
+                if first_date > end_date:
+                    # If the first occurrence is beyond the period end, skip this session
+                    continue
+
+                event = Event()
+                event.add('summary', f"{cls['name']} - Grupo {cls['group']}")
+                event.add('location', session.get('class_room', 'N/A'))
+                event.add('dtstart', datetime.combine(first_date, start_time))
+                event.add('dtend', datetime.combine(first_date, end_time))
+                event.add('rrule', {'freq': 'weekly', 'until': datetime.combine(end_date, time.max.replace(microsecond=0))})
+                excluded = [
+                    datetime.combine(holiday, start_time) for holiday in holidays
+                    if first_date <= holiday <= end_date and holiday.weekday() == weekday
+                ]
+                if excluded:
+                    event.add('exdate', excluded)
+                cal.add_component(event)
+
+    if output is None:
+        output = BytesIO()
+    if isinstance(output, str):
+        with open(output, 'wb') as f:
+            f.write(cal.to_ical())
+    else:
+        output.write(cal.to_ical())
+    return output
+
+# SCHEDULE SET FILES
+# Search results saved to be reopened later without searching again. The file has
+# a JSON header with the table of the classes used by the schedules, followed by
+# the schedules as one flat array of positions in that table, and is compressed
+# with zlib unless compress is False.
+
+SCHEDULE_SET_MAGIC = b"HORARIOS"
+SCHEDULE_SET_VERSION = 1
+COMPRESSED = 1
+
+# combos are tuples of positions in classes, as produced by the schedule search
+def dump_schedule_set(classes, combos, compress=True):
+    used = sorted({index for combo in combos for index in combo})
+    positions = {index: position for position, index in enumerate(used)}
+    table = array('H' if len(used) <= 0xFFFF else 'I', (positions[index] for combo in combos for index in combo))
+    if sys.byteorder == 'big':
+        table.byteswap()
+    header = json.dumps({
+        "version": SCHEDULE_SET_VERSION,
+        "classes": [classes[index] for index in used],
+        "count": len(combos),
+        "size": len(combos[0]) if combos else 0,
+        "typecode": table.typecode,
+    }, ensure_ascii=False, default=str).encode()
+    body = struct.pack('<I', len(header)) + header + table.tobytes()
+    if compress:
+        return SCHEDULE_SET_MAGIC + bytes([COMPRESSED]) + zlib.compress(body)
+    return SCHEDULE_SET_MAGIC + bytes([0]) + body
+
+# Whether a class of the file has the shape of the classes stored in the db
+def is_valid_class(cls):
+    if not isinstance(cls, dict) or not isinstance(cls.get('name'), str) or not isinstance(cls.get('group'), (str, int)):
+        return False
+    schedule = cls.get('schedule')
+    return isinstance(schedule, list) and all(
+        isinstance(session, dict) and isinstance(session.get('day'), str)
+        and isinstance(session.get('start_time'), str) and parse_hhmm(session['start_time']) is not None
+        and isinstance(session.get('end_time'), str) and parse_hhmm(session['end_time']) is not None
+        for session in schedule
+    )
+
+def is_count(value):
+    return isinstance(value, int) and not isinstance(value, bool) and value >= 0
+
+# Returns the classes table and the schedules, as tuples of positions in it
+def load_schedule_set(data):
+    if not data.startswith(SCHEDULE_SET_MAGIC) or len(data) <= len(SCHEDULE_SET_MAGIC):
+        raise ValueError("El archivo no es un archivo de horarios guardados.")
+    flags = data[len(SCHEDULE_SET_MAGIC)]
+    body = data[len(SCHEDULE_SET_MAGIC) + 1:]
+    try:
+        if flags & COMPRESSED:
+            body = zlib.decompress(body)
+        header_size, = struct.unpack_from('<I', body)
+        header = json.loads(body[4:4 + header_size])
+        version = header.get("version")
+        if version == SCHEDULE_SET_VERSION:
+            if header["typecode"] not in ('H', 'I'):
+                raise ValueError("unknown typecode")
+            table = array(header["typecode"])
+            table.frombytes(body[4 + header_size:])
+            count, size = header["count"], header["size"]
+    except (zlib.error, struct.error, ValueError, KeyError, TypeError, AttributeError):
+        raise ValueError("El archivo de horarios está dañado.")
+    if version != SCHEDULE_SET_VERSION:
+        raise ValueError("El archivo de horarios es de una versión no soportada.")
+    classes = header.get("classes")
+    if not isinstance(classes, list) or not all(is_valid_class(cls) for cls in classes):
+        raise ValueError("El archivo de horarios está dañado.")
+    # Only a search of no classes has empty schedules, and it finds a single one
+    if not is_count(count) or not is_count(size) or (size == 0 and count > 1):
+        raise ValueError("El archivo de horarios está dañado.")
+    if len(table) != count * size or (table and max(table) >= len(classes)):
+        raise ValueError("El archivo de horarios está dañado.")
+    if sys.byteorder == 'big':
+        table.byteswap()
+    combos = [tuple(table[i * size:(i + 1) * size]) for i in range(count)]
+    return classes, combos
@@ -0,0 +1,151 @@
+import csv
+import io
+import json
+import re
+from collections import deque
+from itertools import chain
+
+# SCHEDULE IMPORTERS
+# Streaming parsers for the schedules pasted from the university system and for
+# catalog exports (CSV, JSON). They read line by line and yield one record per
+# session, as (name, group, session) tuples, so big catalogs are never held in memory.
+
+# Header of a pasted record, e.g. "Análisis Matemático I (1234)"
+CLASS_HEADER = re.compile(r'^(.*)\s\(\d{4}\)')
+PASTED_RECORD_LINES = 6
+DEFAULT_CLASS_ROOM = "Sin asignar"
+
+# 'H:MM' or 'HH:MM' to a normalized 'HH:MM', or None when it isn't a valid time
+def parse_hhmm(text):
+    hours, separator, minutes = text.strip().partition(':')
+    if not separator or not hours.isdigit() or len(hours) > 2 or not minutes.isdigit() or len(minutes) != 2:
+        return None
+    hours, minutes = int(hours), int(minutes)
+    if hours > 23 or minutes > 59:
+        return None
+    return f"{hours:02d}:{minutes:02d}"
+
+def make_session(day, start_time, end_time, class_room=None):
+    start_time, end_time = parse_hhmm(start_time), parse_hhmm(end_time)
+    if not day or start_time is None or end_time is None:
+        return None
+    return {
+        "day": day,
+        "start_time": start_time,
+        "end_time": end_time,
+        "class_room": class_room or DEFAULT_CLASS_ROOM
+    }
+
+# Parses one pasted record: name (code), group, two ignored lines, day and "HH:MM a HH:MM"
+def parse_pasted_record(lines):
+    header = CLASS_HEADER.match(lines[0])
+    if not header:
+        return None
+    start_time, separator, end_time = lines[5].strip().partition(' a ')
+    if not separator:
+        return None
+    session = make_session(lines[4].strip(), start_time, end_time)
+    if session is None:
+        return None
+    return header.group(1), lines[1].strip(), session
+
+# Pasted format, 6 lines per session. Instead of assuming every record starts on a
+# multiple of 6, the parser looks for the next valid record one line at a time
+# whenever a block doesn't parse, so extra or missing lines only lose that record.
+def iter_pasted_sessions(lines):
+    window = deque()
+    lines = iter(lines)
+    while True:
+        for line in lines:
+            window.append(line.rstrip('\r\n'))
+            if len(window) == PASTED_RECORD_LINES:
+                break
+        if len(window) < PASTED_RECORD_LINES:
+            return
+        record = parse_pasted_record(window)
+        if record is None:
+            window.popleft()
+        else:
+            yield record
+            window.clear()
+
+# CSV with a header row: name, group, day, start_time, end_time and optionally class_room
+def iter_csv_sessions(lines):
+    for row in csv.DictReader(lines):
+        name, group = (row.get('name') or '').strip(), (row.get('group') or '').strip()
+        session = make_session((row.get('day') or '').strip(), row.get('start_time') or '',
+                               row.get('end_time') or '', (row.get('class_room') or '').strip())
+        if name and group and session is not None:
+            yield name, group, session
+
+def iter_json_class_sessions(cls):
+    if not isinstance(cls, dict) or not cls.get('name') or not cls.get('group'):
+        return
+    for session in cls.get('schedule') or []:
+        session = make_session(session.get('day'), session.get('start_time') or '',
+                               session.get('end_time') or '', session.get('class_room'))
+        if session is not None:
+            yield cls['name'], str(cls['group']), session
+
+# JSON in the format the classes are stored in: a list of {name, group, schedule}
+# objects, or one such object per line (JSON Lines, read as a stream)
+def iter_json_sessions(lines):
+    lines = iter(lines)
+    first_line = next((line for line in lines if line.strip()), None)
+    if first_line is None:
+        return
+    if first_line.lstrip().startswith('['):
+        for cls in json.loads(first_line + ''.join(lines)):
+            yield from iter_json_class_sessions(cls)
+        return
+    for line in chain([first_line], lines):
+        if line.strip():
+            yield from iter_json_class_sessions(json.loads(line))
+
+SESSION_PARSERS = {
+    "pasted": iter_pasted_sessions,
+    "csv": iter_csv_sessions,
+    "json": iter_json_sessions,
+}
+
+def detect_format(filename):
+    extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    if extension == 'csv':
+        return "csv"
+    if extension in ('json', 'jsonl'):
+        return "json"
+    return "pasted"
+
+# Groups consecutive sessions of the same class into class dicts, yielding each
+# class as soon as the next one starts
+def iter_classes(sessions):
+    current = None
+    for name, group, session in sessions:
+        if current is None or (current['name'], current['group']) != (name, group):
+            if current is not None:
+                yield current
+            current = {"name": name, "group": group, "schedule": []}
+        current['schedule'].append(session)
+    if current is not None:
+        yield current
+
+# Classes from a text stream (an open file or any iterable of lines) in the given format
+def iter_schedule_classes(stream, format="pasted"):
+    return iter_classes(SESSION_PARSERS[format](stream))
+
+# Merges every session of a class into one class dict, also when its sessions are
+# not consecutive in the input (e.g. a CSV sorted by day). The file is still read
+# as a stream, only the merged classes are kept.
+def merge_classes(classes):
+    merged = {}
+    for cls in classes:
+        key = (cls['name'], cls['group'])
+        if key in merged:
+            merged[key]['schedule'].extend(cls['schedule'])
+        else:
+            merged[key] = cls
+    return list(merged.values())
+
+# Function to parse bulk schedule data, merging every session of a class
+def parse_schedule_data(raw_data, format="pasted"):
+    return merge_classes(iter_schedule_classes(io.StringIO(raw_data.strip()), format))
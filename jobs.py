@@ -0,0 +1,129 @@
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+# BACKGROUND JOBS
+# Searches and exports run on a bounded thread pool shared by every session of the
+# process, so a heavy request doesn't hold the script thread of its session and the
+# number of them running at once is capped. Jobs can't use st.session_state (they
+# don't run in the script thread): they return their result, and the session polls
+# the job on each rerun until it is finished.
+
+class JobQueueFull(Exception):
+    pass
+
+class Job:
+    def __init__(self, owner, kind, key):
+        self.id = uuid.uuid4().hex
+        self.owner = owner
+        self.kind = kind
+        self.key = key
+        self.status = "pending"
+        self.progress = {}
+        self.result = None
+        self.error = None
+        self.finished_at = None
+        self.cancel_event = threading.Event()
+
+    # Called by the job function between steps, with its progress so far.
+    # Returns True once the job has been cancelled and should stop.
+    def check(self, **progress):
+        self.progress.update(progress)
+        return self.cancel_event.is_set()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    @property
+    def finished(self):
+        return self.finished_at is not None
+
+class JobManager:
+    def __init__(self, max_workers=2, max_jobs=32, ttl=600):
+        self.max_workers = max_workers
+        self.max_jobs = max_jobs
+        self.ttl = ttl
+        self.executor = None
+        self.jobs = {}
+        self.active = {}
+        self.lock = threading.Lock()
+
+    # Runs fn(job, *args) in the background and returns the job. A user has at most
+    # one job of each kind: submitting the same key again returns the same job, even
+    # once finished (until it is forgotten), while a different key cancels it and
+    # starts a new one.
+    def submit(self, owner, kind, key, fn, *args):
+        with self.lock:
+            current = self.active.get((owner, kind))
+            if current is not None:
+                if current.key == key and (current.finished or not current.cancelled):
+                    return current
+                if not current.finished:
+                    current.cancel()
+            self.prune()
+            if sum(not job.finished for job in self.jobs.values()) >= self.max_jobs:
+                raise JobQueueFull("Hay demasiadas búsquedas en curso, probá de nuevo en unos segundos.")
+            job = Job(owner, kind, key)
+            self.jobs[job.id] = job
+            self.active[owner, kind] = job
+            # The pool is started with the first job
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix="scheduler-job")
+            self.executor.submit(self.run, job, fn, args)
+        return job
+
+    def run(self, job, fn, args):
+        try:
+            if not job.cancelled:
+                job.status = "running"
+                # A cancelled job keeps the partial result it returns
+                job.result = fn(job, *args)
+            job.status = "cancelled" if job.cancelled else "done"
+        except Exception as e:
+            job.error = e
+            job.status = "failed"
+        finally:
+            job.finished_at = time.monotonic()
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def cancel(self, job_id):
+        job = self.get(job_id)
+        if job is not None:
+            job.cancel()
+
+    # Drops a finished job once its result has been read
+    def forget(self, job_id):
+        with self.lock:
+            job = self.jobs.pop(job_id, None)
+            if job is not None and self.active.get((job.owner, job.kind)) is job:
+                del self.active[job.owner, job.kind]
+
+    # Must be called with the lock held. Finished jobs nobody came back for expire
+    # after ttl seconds.
+    def prune(self):
+        expired = time.monotonic() - self.ttl
+        for job in [job for job in self.jobs.values() if job.finished and job.finished_at < expired]:
+            del self.jobs[job.id]
+            if self.active.get((job.owner, job.kind)) is job:
+                del self.active[job.owner, job.kind]
+
+    def stats(self):
+        with self.lock:
+            statuses = [job.status for job in self.jobs.values()]
+        return {
+            "running": statuses.count("running"),
+            "pending": statuses.count("pending"),
+            "workers": self.max_workers,
+        }
+
+# SCHEDULER_JOB_WORKERS caps the searches and exports running at once in the process
+job_manager = JobManager(max_workers=int(os.environ.get("SCHEDULER_JOB_WORKERS", 2)))
@@ -0,0 +1,21 @@
+import toml
+
+from storage import create_mongo_client, migrate_to_shared_catalog, SharedCatalogStore
+
+# Moves the classes embedded in each user document (class_entries) to the shared
+# sections catalog. Run once from the root directory, then start the app with
+# CLASS_STORE=shared:
+#   python migrate_catalog.py
+
+MONGO_HOST = "cluster0.borki.mongodb.net"
+
+def main():
+    mongo_settings = toml.load(".streamlit/secrets.toml")["MONGODB"]
+    client = create_mongo_client(mongo_settings["user"], mongo_settings["password"], MONGO_HOST)
+    db = client["class_schedule_db"]
+    shared_store = SharedCatalogStore(db["sections"], db["user_sections"], term=mongo_settings.get("term", ""))
+    migrated = migrate_to_shared_catalog(db["class_entries"], shared_store)
+    print(f"{migrated} users migrated, {db['sections'].estimated_document_count()} shared sections")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+import cProfile
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+# PROFILING
+# Timing spans and counters for the stages of the scheduler pipeline. When
+# disabled, span() returns a shared no-op context manager and count() returns
+# right away, so the instrumentation can stay in the hot paths.
+
+logger = logging.getLogger("scheduler.profiling")
+
+NO_SPAN = nullcontext()
+
+class Profiler:
+    def __init__(self, enabled=False, profile_dir=None):
+        self.enabled = enabled
+        self.profile_dir = profile_dir
+        self.spans = {}
+        self.counters = {}
+        self.lock = threading.Lock()
+        if enabled and not logger.handlers:
+            handler = logging.StreamHandler()
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            logger.addHandler(handler)
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+
+    # Times the block under name, logging it as a JSON line with the extra fields
+    def span(self, name, **fields):
+        if not self.enabled:
+            return NO_SPAN
+        return self.timed_span(name, fields)
+
+    @contextmanager
+    def timed_span(self, name, fields):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self.lock:
+                stats = self.spans.setdefault(name, {"calls": 0, "total_ms": 0.0, "max_ms": 0.0})
+                stats["calls"] += 1
+                stats["total_ms"] += elapsed * 1000
+                stats["max_ms"] = max(stats["max_ms"], elapsed * 1000)
+            logger.info(json.dumps({"span": name, "ms": round(elapsed * 1000, 3), **fields}, default=str))
+
+    def count(self, name, value=1):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    # Runs the block under cProfile when a profile directory is set, saving the stats
+    # as <profile_dir>/<name>-<timestamp>.prof (readable with pstats, snakeviz or
+    # flameprof to get a flamegraph)
+    @contextmanager
+    def profile(self, name):
+        if not self.profile_dir:
+            yield
+            return
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            os.makedirs(self.profile_dir, exist_ok=True)
+            path = os.path.join(self.profile_dir, f"{name}-{time.strftime('%Y%m%d-%H%M%S')}.prof")
+            profile.dump_stats(path)
+            logger.info(json.dumps({"profile": name, "path": path}))
+
+    def report(self):
+        with self.lock:
+            return {
+                "spans": {name: dict(stats) for name, stats in self.spans.items()},
+                "counters": dict(self.counters),
+            }
+
+    def reset(self):
+        with self.lock:
+            self.spans.clear()
+            self.counters.clear()
+
+# SCHEDULER_PROFILING=1 turns the spans on, SCHEDULER_CPROFILE_DIR saves cProfile
+# stats of the slow requests in that directory
+profiler = Profiler(
+    enabled=os.environ.get("SCHEDULER_PROFILING") == "1",
+    profile_dir=os.environ.get("SCHEDULER_CPROFILE_DIR")
+)
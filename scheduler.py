@@ -0,0 +1,691 @@
+import heapq
+import threading
+import time
+from datetime import datetime
+from functools import partial
+
+# TIMETABLE SOLVER FUNCTIONS
+# Pure scheduling logic, kept apart from streamlit_app.py so it can be used
+# (and benchmarked) without Streamlit or MongoDB.
+
+def parse_time(time_str):
+    return datetime.strptime(time_str, '%H:%M').time()
+
+# Converts the 'HH:MM' strings stored in the db into datetime.time objects
+def parse_class_times(classes):
+    return [{
+        **cls,
+        'schedule': [{
+            **session,
+            'start_time': parse_time(session['start_time']),
+            'end_time': parse_time(session['end_time'])
+        } for session in cls['schedule']]
+    } for cls in classes]
+
+def times_overlap(start1, end1, start2, end2):
+    return max(start1, start2) < min(end1, end2)
+
+def has_conflict(class1, class2):
+    for session1 in class1['schedule']:
+        for session2 in class2['schedule']:
+            if session1['day'] == session2['day']:
+                if times_overlap(session1['start_time'], session1['end_time'],
+                                 session2['start_time'], session2['end_time']):
+                    return True
+    return False
+
+def has_unique_classes(combination):
+    class_names = [cls['name'] for cls in combination]
+    return len(class_names) == len(set(class_names))
+
+def has_free_days(combination, free_days):
+    # Checks if the combination respects the free days
+    scheduled_days = {session['day'] for cls in combination for session in cls['schedule']}
+    return all(day not in scheduled_days for day in free_days)
+
+def get_unique_time_slots(classes):
+    time_slots = set()
+    for cls in classes:
+        for session in cls['schedule']:
+            time_slots.add((session['start_time'], session['end_time']))
+    return sorted(time_slots, key=lambda x: x[0])
+
+# Groups section indices by subject name, keeping the catalog order
+def group_sections_by_subject(sections, indices=None):
+    groups = {}
+    for index in (range(len(sections)) if indices is None else indices):
+        groups.setdefault(sections[index].name, []).append(index)
+    return groups
+
+# SECTION REPRESENTATION
+
+MINUTES_PER_DAY = 24 * 60
+
+# Position of each day inside the week bitmask. Unknown day names get their own
+# position the first time they are seen, so they only clash with themselves.
+day_positions = {day: index for index, day in enumerate(
+    ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado", "Domingo"])}
+
+def get_day_position(day):
+    return day_positions.setdefault(day, len(day_positions))
+
+# 'HH:MM' to minutes since midnight, without going through strptime
+def parse_minutes(time_str):
+    hours, minutes = time_str.split(':')
+    return int(hours) * 60 + int(minutes)
+
+def days_mask(days):
+    mask = 0
+    for day in days:
+        mask |= 1 << get_day_position(day)
+    return mask
+
+# Bitmask with one bit per minute of the week between start and end (in minutes)
+def session_mask(day, start, end):
+    if end <= start:
+        return 0
+    offset = get_day_position(day) * MINUTES_PER_DAY
+    return ((1 << (end - start)) - 1) << (offset + start)
+
+# Minutes between start and end (both 'HH:MM') on each of the given days
+def window_mask(start_time, end_time, days=None):
+    start, end = parse_minutes(start_time), parse_minutes(end_time)
+    mask = 0
+    for day in (day_positions if days is None else days):
+        mask |= session_mask(day, start, end)
+    return mask
+
+# A registered class parsed once at load time. The weekly occupancy is kept as
+# a single integer with one bit per minute, and the days it meets as a day mask,
+# so conflict, free day and time window checks are bitwise operations.
+# cls is the class dict with datetime.time objects, as used by the exports.
+class Section:
+    __slots__ = ('name', 'group', 'mask', 'day_mask', 'cls')
+
+    def __init__(self, cls):
+        self.name = cls['name']
+        self.group = cls['group']
+        self.mask = 0
+        self.day_mask = 0
+        for session in cls['schedule']:
+            self.mask |= session_mask(session['day'], parse_minutes(session['start_time']),
+                                      parse_minutes(session['end_time']))
+            self.day_mask |= 1 << get_day_position(session['day'])
+        self.cls = parse_class_times([cls])[0]
+
+    def has_conflict(self, other):
+        return bool(self.mask & other.mask)
+
+    def meets_on(self, day_mask):
+        return bool(self.day_mask & day_mask)
+
+    def fits_in_window(self, window_mask):
+        return not self.mask & ~window_mask
+
+    # Picklable form without the parsed class, for worker processes
+    def compact(self):
+        return self.name, self.group, self.mask, self.day_mask
+
+def section_from_compact(row):
+    section = Section.__new__(Section)
+    section.name, section.group, section.mask, section.day_mask = row
+    section.cls = None
+    return section
+
+# Builds the sections for the classes stored in the db ('HH:MM' times)
+def load_sections(classes):
+    return [Section(cls) for cls in classes]
+
+# Pairwise section conflicts, computed once per catalog.
+# Each section gets an id and a bitset of the ids it conflicts with, so checking
+# a pair (or a section against a whole partial schedule) is a single AND.
+# Sections can be added and removed without rebuilding the rest of the index.
+class ConflictIndex:
+    def __init__(self, sections=()):
+        self.masks = {}
+        self.conflicts = {}
+        self.next_id = 0
+        for section in sections:
+            self.add(section)
+
+    # Adds a section and returns its id
+    def add(self, section):
+        section_id = self.next_id
+        self.next_id += 1
+        mask = section.mask
+        conflicts = 0
+        for other_id, other_mask in self.masks.items():
+            if mask & other_mask:
+                conflicts |= 1 << other_id
+                self.conflicts[other_id] |= 1 << section_id
+        self.masks[section_id] = mask
+        self.conflicts[section_id] = conflicts
+        return section_id
+
+    def remove(self, section_id):
+        del self.masks[section_id]
+        conflicts = self.conflicts.pop(section_id)
+        bit = 1 << section_id
+        other_id = 0
+        while conflicts:
+            if conflicts & 1:
+                self.conflicts[other_id] &= ~bit
+            conflicts >>= 1
+            other_id += 1
+
+    def has_conflict(self, section_id1, section_id2):
+        return bool(self.conflicts[section_id1] >> section_id2 & 1)
+
+    # Independent copy, for changes that must not reach a shared index
+    def copy(self):
+        index = ConflictIndex.__new__(ConflictIndex)
+        index.masks = dict(self.masks)
+        index.conflicts = dict(self.conflicts)
+        index.next_id = self.next_id
+        return index
+
+# SCHEDULE CONSTRAINTS
+
+# Whether bits has at least length consecutive set bits. Each step ANDs the bits
+# with a shifted copy, doubling the run length covered, so it takes log(length) steps.
+def has_run(bits, length):
+    span = 1
+    while bits and span * 2 <= length:
+        bits &= bits >> span
+        span *= 2
+    if bits and span < length:
+        bits &= bits >> (length - span)
+    return bool(bits)
+
+# Limits a schedule has to respect, checked while the search runs.
+# The time window and the excluded sections rule out single sections before the
+# search starts. The daily limits are checked on the week occupancy of the partial
+# schedule each time a section is added, only on the days that section meets.
+# Adding sections can only make a daily limit worse, so a partial schedule that
+# breaks one is dropped along with every schedule that would extend it.
+# Times are 'HH:MM', lunch_break is in minutes and excluded holds (name, group) pairs.
+class Constraints:
+    def __init__(self, earliest_start=None, latest_end=None, max_daily_hours=None, max_consecutive_hours=None,
+                 lunch_break=None, lunch_window=("12:00", "15:00"), excluded=()):
+        self.window = None
+        if earliest_start or latest_end:
+            self.window = window_mask(earliest_start or "00:00", latest_end or "24:00")
+        self.max_daily_minutes = round(max_daily_hours * 60) if max_daily_hours else None
+        self.max_consecutive_minutes = round(max_consecutive_hours * 60) if max_consecutive_hours else None
+        self.lunch_break = lunch_break or None
+        lunch_start, lunch_end = parse_minutes(lunch_window[0]), parse_minutes(lunch_window[1])
+        # Minutes of the lunch window within a day
+        self.lunch_mask = ((1 << max(lunch_end - lunch_start, 0)) - 1) << lunch_start
+        self.excluded = set(excluded)
+        self.checks_days = bool(self.max_daily_minutes or self.max_consecutive_minutes or self.lunch_break)
+
+    def allows_section(self, section):
+        if (section.name, section.group) in self.excluded:
+            return False
+        if self.window is not None and not section.fits_in_window(self.window):
+            return False
+        return self.allows(section.mask, section.day_mask)
+
+    # Checks the daily limits on the days in day_mask of a week occupancy mask
+    def allows(self, mask, day_mask):
+        if not self.checks_days:
+            return True
+        position = 0
+        while day_mask:
+            if day_mask & 1:
+                minutes = mask >> (position * MINUTES_PER_DAY) & DAY_BITS
+                if self.max_daily_minutes and minutes.bit_count() > self.max_daily_minutes:
+                    return False
+                if self.max_consecutive_minutes and has_run(minutes, self.max_consecutive_minutes + 1):
+                    return False
+                if self.lunch_break and not has_run(~minutes & self.lunch_mask, self.lunch_break):
+                    return False
+            day_mask >>= 1
+            position += 1
+        return True
+
+# SCHEDULE SEARCH
+
+# The search yields None every this many explored nodes, so callers can stop on
+# a time budget even while no schedule is being found
+SEARCH_TICK = 1024
+
+# Order in which subjects are placed by the search, and the available sections of
+# each one. Returns None when no schedule can satisfy the filters.
+# With required, only schedules including that section are searched.
+def plan_search(sections, num_classes, mandatory_classes=(), free_days=(), required=None, constraints=None):
+    mandatory = list(dict.fromkeys(mandatory_classes))
+
+    # Sections with a session on a free day can never be part of a viable schedule.
+    # Removed sections are left as None, so the other positions don't change.
+    free_mask = days_mask(free_days)
+    available = [
+        index for index, section in enumerate(sections)
+        if section is not None and not section.meets_on(free_mask)
+        and (constraints is None or constraints.allows_section(section))
+    ]
+    groups = group_sections_by_subject(sections, available)
+    if required is not None:
+        if required not in groups.get(sections[required].name, ()):
+            return None
+        groups[sections[required].name] = [required]
+        if sections[required].name not in mandatory:
+            mandatory.append(sections[required].name)
+
+    if num_classes < len(mandatory) or any(name not in groups for name in mandatory):
+        return None
+
+    # Mandatory subjects with fewer sections first, they prune the most
+    mandatory.sort(key=lambda name: len(groups[name]))
+    optional = [name for name in groups if name not in mandatory]
+    return mandatory + optional, groups, len(mandatory)
+
+# Backtracking search over subjects instead of over every combination of sections.
+# Mandatory subjects are placed first and a partial schedule is dropped as soon as
+# a section conflicts with it, so conflicting branches are never expanded.
+# explored counts the partial schedules expanded and pruned the branches cut
+# (conflicting sections, or too few subjects left).
+# Schedules are produced lazily as sorted tuples of section indices, in search
+# order; take() pulls them a page at a time so the full result set is never
+# materialized.
+# prefix restricts the search to one partition: prefix[i] is the branch taken for
+# the i-th subject (a position in its sections, or one past the end to leave it out).
+# constraints (a Constraints) are checked on every partial schedule.
+class ScheduleSearch:
+    def __init__(self, sections, num_classes, mandatory_classes=(), free_days=(), conflict_index=None, prefix=(),
+                 required=None, constraints=None):
+        self.sections = sections
+        self.explored = 0
+        self.pruned = 0
+        self.found = 0
+        self.exhausted = False
+        self.steps = self.search(num_classes, mandatory_classes, free_days, conflict_index, prefix, required,
+                                 constraints)
+
+    def search(self, num_classes, mandatory_classes, free_days, conflict_index, prefix, required, constraints):
+        sections = self.sections
+        plan = plan_search(sections, num_classes, mandatory_classes, free_days, required, constraints)
+        if plan is None:
+            return
+        subjects, groups, num_mandatory = plan
+
+        # Section ids in the index are the positions in sections
+        if conflict_index is None:
+            conflict_index = ConflictIndex(sections)
+        conflicts = conflict_index.conflicts
+        chosen = []
+
+        # The occupancy of the partial schedule is only tracked when there are daily limits
+        allows = None
+        if constraints is not None and constraints.checks_days:
+            allows = constraints.allows
+            masks = {index: sections[index].mask for indices in groups.values() for index in indices}
+            day_masks = {index: sections[index].day_mask for indices in groups.values() for index in indices}
+
+        # blocked holds every section that conflicts with the partial schedule, and
+        # occupied the minutes it takes (only with daily limits)
+        def place(subject_pos, blocked, occupied):
+            self.explored += 1
+            if self.explored % SEARCH_TICK == 0:
+                yield None
+            remaining = num_classes - len(chosen)
+            if remaining == 0:
+                # Inside a partition the schedule belongs to the branch that leaves out
+                # every remaining prefix subject, so it is only produced once
+                if all(prefix[pos] == len(groups[subjects[pos]]) for pos in range(subject_pos, len(prefix))):
+                    self.found += 1
+                    yield tuple(sorted(chosen))
+                return
+            if len(subjects) - subject_pos < remaining:
+                self.pruned += 1
+                return
+
+            candidates = groups[subjects[subject_pos]]
+            if subject_pos < len(prefix):
+                branch = prefix[subject_pos]
+                if branch < len(candidates):
+                    candidates = candidates[branch:branch + 1]
+                else:
+                    if subject_pos >= num_mandatory:
+                        yield from place(subject_pos + 1, blocked, occupied)
+                    return
+
+            for index in candidates:
+                if blocked >> index & 1:
+                    self.pruned += 1
+                    continue
+                next_occupied = 0
+                if allows is not None:
+                    next_occupied = occupied | masks[index]
+                    if not allows(next_occupied, day_masks[index]):
+                        self.pruned += 1
+                        continue
+                chosen.append(index)
+                yield from place(subject_pos + 1, blocked | conflicts[index], next_occupied)
+                chosen.pop()
+
+            # Optional subjects can also be left out of the schedule
+            if subject_pos >= num_mandatory and subject_pos >= len(prefix):
+                yield from place(subject_pos + 1, blocked, occupied)
+
+        yield from place(0, 0, 0)
+
+    # Returns up to limit more schedules, stopping early once time_budget seconds
+    # have passed or stop() returns True. The search can be resumed with another
+    # call until exhausted.
+    def take(self, limit, time_budget=None, stop=None):
+        deadline = None if time_budget is None else time.perf_counter() + time_budget
+        batch = []
+        if limit <= 0:
+            return batch
+        for combo in self.steps:
+            if combo is not None:
+                batch.append(combo)
+                if len(batch) >= limit:
+                    return batch
+            if deadline is not None and time.perf_counter() > deadline:
+                return batch
+            if stop is not None and stop():
+                return batch
+        self.exhausted = True
+        return batch
+
+    def __iter__(self):
+        for combo in self.steps:
+            if combo is not None:
+                yield combo
+        self.exhausted = True
+
+# Maps a schedule of section indices back to the parsed classes
+def schedule_classes(sections, combo):
+    return tuple(sections[index].cls for index in combo)
+
+# Returns the same combinations (as tuples of parsed classes, in the same order) as
+# filtering itertools.combinations(classes, num_classes) with has_conflict,
+# has_unique_classes, has_free_days and the mandatory class check.
+# With workers > 1 the search runs on a process pool.
+def find_viable_schedules(sections, num_classes, mandatory_classes=(), free_days=(), conflict_index=None, workers=1,
+                          constraints=None):
+    if workers > 1:
+        results = sorted(parallel_viable_schedules(sections, num_classes, mandatory_classes, free_days, workers,
+                                                   constraints, conflict_index))
+    else:
+        results = sorted(ScheduleSearch(sections, num_classes, mandatory_classes, free_days, conflict_index,
+                                        constraints=constraints))
+    return [schedule_classes(sections, combo) for combo in results]
+
+# INCREMENTAL SEARCH
+
+# Keeps the full result set of a finished search so it can follow changes to the
+# catalog: an added section only searches the schedules that include it, and a
+# removed section only filters out the schedules that contain it. Positions of
+# removed sections are kept as None so section ids stay stable.
+# A conflict_index of the sections can be given, the solver works on a copy of it.
+class IncrementalSolver:
+    def __init__(self, sections, num_classes, mandatory_classes=(), free_days=(), results=None, constraints=None,
+                 conflict_index=None):
+        self.sections = list(sections)
+        self.num_classes = num_classes
+        self.mandatory_classes = list(mandatory_classes)
+        self.free_days = list(free_days)
+        self.constraints = constraints
+        self.conflict_index = ConflictIndex(self.sections) if conflict_index is None else conflict_index.copy()
+        if results is None:
+            results = ScheduleSearch(self.sections, num_classes, self.mandatory_classes, self.free_days,
+                                     self.conflict_index, constraints=constraints)
+        self.results = sorted(results)
+
+    def add(self, section):
+        index = len(self.sections)
+        self.sections.append(section)
+        self.conflict_index.add(section)
+        found = ScheduleSearch(self.sections, self.num_classes, self.mandatory_classes, self.free_days,
+                               self.conflict_index, required=index, constraints=self.constraints)
+        self.results = sorted(self.results + list(found))
+        return index
+
+    def remove(self, index):
+        self.sections[index] = None
+        self.conflict_index.remove(index)
+        self.results = [combo for combo in self.results if index not in combo]
+
+    # Brings the solver in line with a new list of sections (e.g. after the catalog
+    # was edited), matching sections by name, group and occupancy. Returns the
+    # results as positions in the new list, or None when the lists can't be matched.
+    def sync(self, sections):
+        def key(section):
+            return section.name, section.group, section.mask
+
+        positions = {}
+        for position, section in enumerate(sections):
+            positions.setdefault(key(section), []).append(position)
+        current = {}
+        for index, section in enumerate(self.sections):
+            if section is not None:
+                current.setdefault(key(section), []).append(index)
+        # Repeated sections can't be told apart
+        if any(len(indices) > 1 for indices in positions.values()) or any(len(indices) > 1 for indices in current.values()):
+            return None
+
+        for section_key, (index,) in current.items():
+            if section_key not in positions:
+                self.remove(index)
+        new_positions = {}
+        for section_key, (position,) in positions.items():
+            if section_key in current:
+                new_positions[current[section_key][0]] = position
+            else:
+                new_positions[self.add(sections[position])] = position
+        return sorted(tuple(sorted(new_positions[index] for index in combo)) for combo in self.results)
+
+# SCHEDULE RANKING
+
+DAY_BITS = (1 << MINUTES_PER_DAY) - 1
+
+# Criteria a schedule can be ranked by. Lower scores are better: each criterion
+# adds its weight per unit, preferred subjects subtract it.
+SCORING_CRITERIA = {
+    'gaps': "Menos horas libres entre clases",
+    'latest_end': "Salir más temprano",
+    'days': "Menos días en la facultad",
+    'preferred': "Incluir materias preferidas",
+}
+
+# Idle minutes between sessions, latest end (minutes since midnight) and days
+# with classes, read straight from a week occupancy mask
+def occupancy_stats(mask):
+    gaps = latest_end = days = 0
+    while mask:
+        minutes = mask & DAY_BITS
+        if minutes:
+            days += 1
+            first = (minutes & -minutes).bit_length() - 1
+            end = minutes.bit_length()
+            gaps += end - first - minutes.bit_count()
+            latest_end = max(latest_end, end)
+        mask >>= MINUTES_PER_DAY
+    return gaps, latest_end, days
+
+def schedule_score(sections, combo, weights, preferred_classes=()):
+    mask = 0
+    for index in combo:
+        mask |= sections[index].mask
+    gaps, latest_end, days = occupancy_stats(mask)
+    preferred = sum(1 for index in combo if sections[index].name in preferred_classes)
+    return (weights.get('gaps', 0) * gaps / 60
+            + weights.get('latest_end', 0) * latest_end / 60
+            + weights.get('days', 0) * days
+            - weights.get('preferred', 0) * preferred)
+
+# Best k schedules of a search, as (score, combo) pairs sorted by score.
+# Only a bounded heap of k schedules is kept while the search runs. With a
+# time_budget (or once stop() returns True) the search stops early and the best
+# schedules found so far are returned.
+def find_best_schedules(search, k, weights, preferred_classes=(), time_budget=None, stop=None):
+    preferred_classes = set(preferred_classes)
+    deadline = None if time_budget is None else time.perf_counter() + time_budget
+
+    def scored():
+        for combo in search.steps:
+            if combo is not None:
+                yield schedule_score(search.sections, combo, weights, preferred_classes), combo
+            if deadline is not None and time.perf_counter() > deadline:
+                return
+            if stop is not None and stop():
+                return
+        search.exhausted = True
+
+    return heapq.nsmallest(k, scored())
+
+# PARALLEL SEARCH
+
+# Each worker gets enough partitions to even out the uneven size of the branches
+PARTITIONS_PER_WORKER = 8
+
+# Worker processes receive the compact catalog once, when the pool starts
+worker_sections = None
+worker_conflict_index = None
+
+# conflicts are the pairwise conflicts of a ConflictIndex of the catalog, so the
+# workers don't compute them again
+def init_search_worker(catalog, conflicts=None):
+    global worker_sections, worker_conflict_index
+    worker_sections = [section_from_compact(row) for row in catalog]
+    if conflicts is None:
+        worker_conflict_index = ConflictIndex(worker_sections)
+    else:
+        worker_conflict_index = ConflictIndex()
+        worker_conflict_index.masks = {index: section.mask for index, section in enumerate(worker_sections)}
+        worker_conflict_index.conflicts = conflicts
+        worker_conflict_index.next_id = len(worker_sections)
+
+def search_partition(num_classes, mandatory_classes, free_days, constraints, prefix):
+    return list(ScheduleSearch(worker_sections, num_classes, mandatory_classes, free_days,
+                               worker_conflict_index, prefix, constraints=constraints))
+
+# deadline is a time.time() timestamp, shared by every worker
+def rank_partition(num_classes, mandatory_classes, free_days, constraints, k, weights, preferred_classes, deadline,
+                   prefix):
+    search = ScheduleSearch(worker_sections, num_classes, mandatory_classes, free_days,
+                            worker_conflict_index, prefix, constraints=constraints)
+    time_budget = None if deadline is None else max(deadline - time.time(), 0)
+    return find_best_schedules(search, k, weights, preferred_classes, time_budget), search.exhausted
+
+# Splits the search space by the branches taken for the first subjects, until
+# there are at least min_partitions of them. Partitions are listed in the order
+# the serial search visits them.
+def search_partitions(sections, num_classes, mandatory_classes=(), free_days=(), min_partitions=1, constraints=None):
+    plan = plan_search(sections, num_classes, mandatory_classes, free_days, constraints=constraints)
+    if plan is None:
+        return []
+    subjects, groups, num_mandatory = plan
+    prefixes = [()]
+    for subject_pos, name in enumerate(subjects):
+        if len(prefixes) >= min_partitions:
+            break
+        branches = len(groups[name]) + (1 if subject_pos >= num_mandatory else 0)
+        prefixes = [prefix + (branch,) for prefix in prefixes for branch in range(branches)]
+    return prefixes
+
+# The pools of the last MAX_SEARCH_POOLS catalogs searched are kept for the next
+# searches over them, least recently used first. Every search holds its pool while
+# it runs: a pool dropped from the list (or one that broke) is only shut down once
+# no search is using it.
+MAX_SEARCH_POOLS = 2
+pool_lock = threading.Lock()
+search_pools = {}  # (catalog, workers) -> [executor, searches using it]
+
+# Workers are started with forkserver (spawn where it isn't available): forking
+# the multi-threaded server process could copy a lock held by another thread.
+def acquire_search_pool(sections, workers, conflict_index=None):
+    # Only loaded when a parallel search is requested
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    key = (tuple(section.compact() for section in sections), workers)
+    with pool_lock:
+        pool = search_pools.pop(key, None)
+        if pool is None:
+            start_method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            executor = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context(start_method),
+                                           initializer=init_search_worker,
+                                           initargs=(list(key[0]),
+                                                     None if conflict_index is None else conflict_index.conflicts))
+            pool = [executor, 0]
+        pool[1] += 1
+        search_pools[key] = pool
+        while len(search_pools) > MAX_SEARCH_POOLS:
+            oldest = next(iter(search_pools))
+            retire_search_pool(search_pools.pop(oldest))
+    return pool
+
+def release_search_pool(pool):
+    with pool_lock:
+        pool[1] -= 1
+        if all(current is not pool for current in search_pools.values()):
+            retire_search_pool(pool)
+
+# Must be called with the lock held, after dropping the pool from search_pools
+def retire_search_pool(pool):
+    if pool[1] == 0:
+        pool[0].shutdown(wait=False)
+
+# Drops a pool that can't be used anymore (e.g. a worker died), so the next search starts a new one
+def discard_search_pool(pool):
+    with pool_lock:
+        for key, current in list(search_pools.items()):
+            if current is pool:
+                del search_pools[key]
+
+# Results of the partitions in order. Once stop() returns True the partitions not
+# started yet are cancelled, without shutting down the shared pool.
+def run_partitions(sections, workers, function, prefixes, stop=None, conflict_index=None):
+    from concurrent.futures.process import BrokenProcessPool
+
+    pool = acquire_search_pool(sections, workers, conflict_index)
+    futures = []
+    results = []
+    try:
+        for prefix in prefixes:
+            futures.append(pool[0].submit(function, prefix))
+        for future in futures:
+            results.append(future.result())
+            if stop is not None and stop():
+                break
+    except BrokenProcessPool:
+        discard_search_pool(pool)
+        raise
+    finally:
+        for future in futures:
+            future.cancel()
+        release_search_pool(pool)
+    return results
+
+# Same schedules, in the same order, as iterating a ScheduleSearch, with the
+# partitions of the search space spread over a process pool
+def parallel_viable_schedules(sections, num_classes, mandatory_classes=(), free_days=(), workers=2, constraints=None,
+                              conflict_index=None):
+    mandatory_classes, free_days = list(mandatory_classes), list(free_days)
+    prefixes = search_partitions(sections, num_classes, mandatory_classes, free_days,
+                                 workers * PARTITIONS_PER_WORKER, constraints)
+    batches = run_partitions(sections, workers,
+                             partial(search_partition, num_classes, mandatory_classes, free_days, constraints), prefixes,
+                             conflict_index=conflict_index)
+    return [combo for batch in batches for combo in batch]
+
+# Parallel find_best_schedules: every partition keeps its own best k and they are
+# merged at the end. Returns the best schedules and whether the search finished
+# within the time budget. stop() is checked as partitions finish, and the pending
+# ones are cancelled once it returns True.
+def parallel_best_schedules(sections, num_classes, mandatory_classes, free_days, k, weights,
+                            preferred_classes=(), workers=2, time_budget=None, stop=None, constraints=None,
+                            conflict_index=None):
+    mandatory_classes, free_days = list(mandatory_classes), list(free_days)
+    deadline = None if time_budget is None else time.time() + time_budget
+    prefixes = search_partitions(sections, num_classes, mandatory_classes, free_days,
+                                 workers * PARTITIONS_PER_WORKER, constraints)
+    rank = partial(rank_partition, num_classes, mandatory_classes, free_days, constraints, k, weights,
+                   set(preferred_classes), deadline)
+    results = run_partitions(sections, workers, rank, prefixes, stop, conflict_index)
+    best = heapq.nsmallest(k, (scored for partition_best, _ in results for scored in partition_best))
+    return best, len(results) == len(prefixes) and all(exhausted for _, exhausted in results)
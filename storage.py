@@ -0,0 +1,298 @@
+import copy
+import hashlib
+import json
+import threading
+import time
+from array import array
+from collections import OrderedDict
+
+# CLASS CACHE
+# Lives outside streamlit_app.py because Streamlit re-executes the app script on
+# every rerun, while imported modules (and their state) are kept per process.
+
+# Per user cache of the classes stored in the db, shared by every session of the
+# process. Entries expire after ttl seconds and writes update the cached entry
+# instead of forcing a new read.
+class ClassCache:
+    def __init__(self, ttl=300, max_users=1024):
+        self.ttl = ttl
+        self.max_users = max_users
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    # Returns the cached classes for id, calling load(id) on a miss
+    def get(self, id, load):
+        with self.lock:
+            entry = self.entries.get(id)
+            if entry is not None and entry[0] > time.monotonic():
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        classes = load(id)
+        self.set(id, classes)
+        return classes
+
+    def set(self, id, classes):
+        with self.lock:
+            self.entries.pop(id, None)
+            self.entries[id] = (time.monotonic() + self.ttl, classes)
+            # Oldest entries go first when the cache is full
+            while len(self.entries) > self.max_users:
+                del self.entries[next(iter(self.entries))]
+
+    # Replaces a cached entry with update(classes). Users that are not cached are
+    # left alone, their next read goes to the db anyway.
+    def update(self, id, update):
+        with self.lock:
+            entry = self.entries.get(id)
+            if entry is not None:
+                self.entries[id] = (entry[0], update(entry[1]))
+
+    def invalidate(self, id):
+        with self.lock:
+            self.entries.pop(id, None)
+
+    def stats(self):
+        with self.lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "users": len(self.entries),
+            }
+
+class_cache = ClassCache()
+
+# TIMETABLE RESULT CACHE
+
+def catalog_fingerprint(classes):
+    return hashlib.sha1(json.dumps(classes, sort_keys=True, default=str).encode()).hexdigest()
+
+# Generated timetables keyed by (user id, catalog fingerprint, filters). Schedules
+# are stored as a flat array of section indices next to the workbook bytes, and the
+# least recently used entries are dropped once max_bytes is exceeded.
+class ResultCache:
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    # Returns (combos, complete, xlsx) or None
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.entries.move_to_end(key)
+        count, indices, complete, xlsx, _ = entry
+        num_classes = len(indices) // count if count else 0
+        combos = [tuple(indices[i * num_classes:(i + 1) * num_classes]) for i in range(count)]
+        return combos, complete, xlsx
+
+    def put(self, key, combos, complete, xlsx):
+        indices = array('I', (index for combo in combos for index in combo))
+        size = len(indices) * indices.itemsize + len(xlsx or b"")
+        with self.lock:
+            self.discard(key)
+            if size > self.max_bytes:
+                return
+            self.entries[key] = (len(combos), indices, complete, xlsx, size)
+            self.size += size
+            while self.size > self.max_bytes:
+                self.discard(next(iter(self.entries)))
+
+    # Must be called with the lock held
+    def discard(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry[-1]
+
+    # Keys start with the user id, so every result of a user goes when its classes change
+    def invalidate_user(self, id):
+        with self.lock:
+            for key in [key for key in self.entries if key[0] == id]:
+                self.discard(key)
+
+    def stats(self):
+        with self.lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self.entries), "bytes": self.size}
+
+result_cache = ResultCache()
+
+# CLASS STORES
+# Backends holding the classes registered by each user. MemoryClassStore is a
+# stand-in for MongoDB in tests and benchmarks.
+
+class MongoClassStore:
+    def __init__(self, collection):
+        self.collection = collection
+
+    def load(self, id):
+        user_data = self.collection.find_one({"id": id}, {"classes": 1, "_id": 0})
+        return user_data.get("classes", []) if user_data else []
+
+    # Adds several classes with a single round-trip
+    def push(self, id, classes_data):
+        self.collection.update_one(
+            {"id": id},
+            {"$push": {"classes": {"$each": classes_data}}},
+            upsert=True
+        )
+
+    # Removes several (name, group) classes with a single $pull
+    def pull(self, id, class_keys):
+        self.collection.update_one(
+            {"id": id},
+            {"$pull": {"classes": {"$or": [{"name": class_name, "group": group} for class_name, group in class_keys]}}}
+        )
+
+class MemoryClassStore:
+    def __init__(self):
+        self.users = {}
+        self.lock = threading.Lock()
+
+    def load(self, id):
+        with self.lock:
+            return copy.deepcopy(self.users.get(id, []))
+
+    def push(self, id, classes_data):
+        with self.lock:
+            self.users.setdefault(id, []).extend(copy.deepcopy(classes_data))
+
+    def pull(self, id, class_keys):
+        with self.lock:
+            self.users[id] = [
+                cls for cls in self.users.get(id, []) if (cls['name'], cls['group']) not in class_keys
+            ]
+
+# pymongo is only imported when a connection is actually needed. The client keeps
+# its own connection pool and should be created once per process.
+def create_mongo_client(user, password, host, max_pool_size=50, timeout_ms=5000):
+    from pymongo import MongoClient
+
+    mongo_uri = f"mongodb+srv://{user}:{password}@{host}/?retryWrites=true&w=majority&appName=Cluster0"
+    return MongoClient(
+        mongo_uri,
+        maxPoolSize=max_pool_size,
+        serverSelectionTimeoutMS=timeout_ms,
+        connectTimeoutMS=timeout_ms
+    )
+
+# SHARED CATALOG
+# Instead of a full copy of every class in each user document, sections are stored
+# once in a shared collection and user documents only hold references to them.
+# A section id is a hash of its content, so sections registered with the same data
+# by different users are stored once, and a cached section can never be stale.
+
+def section_id(cls, term):
+    content = [cls['name'], cls['group'], term, cls['schedule']]
+    return hashlib.sha1(json.dumps(content, sort_keys=True, default=str).encode()).hexdigest()
+
+# Process level cache of shared sections, by id
+class SectionCache:
+    def __init__(self, max_sections=100_000):
+        self.max_sections = max_sections
+        self.sections = OrderedDict()
+        self.lock = threading.Lock()
+
+    # Returns the cached sections and the ids that are missing
+    def get_many(self, ids):
+        found, missing = {}, []
+        with self.lock:
+            for sid in ids:
+                section = self.sections.get(sid)
+                if section is None:
+                    missing.append(sid)
+                else:
+                    self.sections.move_to_end(sid)
+                    found[sid] = section
+        return found, missing
+
+    def set_many(self, sections):
+        with self.lock:
+            for sid, section in sections.items():
+                self.sections[sid] = section
+                self.sections.move_to_end(sid)
+            while len(self.sections) > self.max_sections:
+                self.sections.popitem(last=False)
+
+section_cache = SectionCache()
+
+class SharedCatalogStore:
+    def __init__(self, sections_collection, users_collection, term=""):
+        self.sections = sections_collection
+        self.users = users_collection
+        self.term = term
+        self.sections.create_index([("name", 1), ("group", 1), ("term", 1)])
+        self.users.create_index("id", unique=True)
+
+    # Sections by id, reading from the db only the ones that are not cached
+    def resolve(self, ids):
+        found, missing = section_cache.get_many(set(ids))
+        if missing:
+            loaded = {
+                doc["_id"]: {"name": doc["name"], "group": doc["group"], "schedule": doc["schedule"]}
+                for doc in self.sections.find({"_id": {"$in": missing}}, {"name": 1, "group": 1, "schedule": 1})
+            }
+            section_cache.set_many(loaded)
+            found.update(loaded)
+        return found
+
+    def section_ids(self, id):
+        user_data = self.users.find_one({"id": id}, {"sections": 1, "_id": 0})
+        return user_data.get("sections", []) if user_data else []
+
+    def load(self, id):
+        ids = self.section_ids(id)
+        found = self.resolve(ids)
+        # References to sections that no longer exist are skipped
+        return [found[sid] for sid in ids if sid in found]
+
+    # Upserts the sections (one bulk write) and adds their references to the user
+    def push(self, id, classes_data):
+        from pymongo import UpdateOne
+
+        term = self.term
+        ids = [section_id(cls, cls.get('term', term)) for cls in classes_data]
+        self.sections.bulk_write([
+            UpdateOne({"_id": sid}, {"$setOnInsert": {
+                "name": cls['name'], "group": cls['group'], "term": cls.get('term', term), "schedule": cls['schedule']
+            }}, upsert=True)
+            for sid, cls in zip(ids, classes_data)
+        ], ordered=False)
+        self.users.update_one({"id": id}, {"$push": {"sections": {"$each": ids}}}, upsert=True)
+        section_cache.set_many({
+            sid: {"name": cls['name'], "group": cls['group'], "schedule": cls['schedule']}
+            for sid, cls in zip(ids, classes_data)
+        })
+
+    # Removes the user's references to the (name, group) classes; shared sections stay
+    def pull(self, id, class_keys):
+        found = self.resolve(self.section_ids(id))
+        removed = [sid for sid, cls in found.items() if (cls['name'], cls['group']) in class_keys]
+        if removed:
+            self.users.update_one({"id": id}, {"$pull": {"sections": {"$in": removed}}})
+
+# Copies the classes embedded in each user document into a shared catalog store.
+# Users that already have a document in the shared store are skipped, so the
+# migration can be run again after an interruption. Returns the number of users migrated.
+def migrate_to_shared_catalog(embedded_collection, shared_store):
+    migrated = 0
+    for user_data in embedded_collection.find({}, {"id": 1, "classes": 1, "_id": 0}):
+        if shared_store.users.find_one({"id": user_data["id"]}, {"_id": 1}) is not None:
+            continue
+        classes = user_data.get("classes", [])
+        if classes:
+            shared_store.push(user_data["id"], classes)
+        else:
+            shared_store.users.update_one({"id": user_data["id"]}, {"$setOnInsert": {"sections": []}}, upsert=True)
+        migrated += 1
+    return migrated